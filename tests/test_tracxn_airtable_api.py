@@ -0,0 +1,477 @@
+import os
+import threading
+import time
+
+import pytest
+
+import tracxn_airtable_api as app
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "TRACXN_CACHE_DIR", tmp_path / "cache")
+    return tmp_path / "cache"
+
+
+def test_write_cached_companies_assigns_companies_by_domain(cache_dir):
+    companies = [
+        {"name": "A", "domain": "www.A.com"},
+        {"name": "B", "domain": "https://b.com/about"},
+        {"name": "Other", "domain": "other.com"},
+    ]
+    app.write_cached_companies(["a.com", "b.com", "c.com"], companies)
+
+    assert sorted(path.name for path in cache_dir.iterdir()) == ["a.com.json", "b.com.json"]
+    assert app.read_cached_companies("a.com") == [companies[0]]
+    assert app.read_cached_companies("b.com") == [companies[1]]
+    assert app.read_cached_companies("c.com") is None
+
+
+def test_write_cached_companies_single_domain_takes_all_results(cache_dir):
+    companies = [{"name": "A"}, {"name": "A Holding", "domain": "a-holding.com"}]
+    app.write_cached_companies(["a.com"], companies)
+
+    assert app.read_cached_companies("a.com") == companies
+
+
+def test_split_cached_deduplicates_and_reports_missing_domains(cache_dir):
+    app.write_cached_companies(["a.com"], [{"name": "A", "domain": "a.com"}])
+
+    cached, missing = app.split_cached(["https://a.com", "A.com", " www.a.com\n", "B.com", "https://b.com"])
+
+    assert cached == [{"name": "A", "domain": "a.com"}]
+    assert missing == ["b.com"]
+
+
+def test_split_cached_ignores_expired_entries(cache_dir):
+    app.write_cached_companies(["a.com"], [{"name": "A", "domain": "a.com"}])
+    expired = time.time() - app.TRACXN_CACHE_TTL - 1
+    os.utime(cache_dir / "a.com.json", (expired, expired))
+
+    assert app.split_cached(["a.com"]) == ([], ["a.com"])
+
+
+def test_write_cached_companies_logs_write_failures(cache_dir, caplog):
+    long_domain = "a" * 250 + ".com"
+    companies = [{"name": "Long", "domain": long_domain}, {"name": "B", "domain": "b.com"}]
+
+    app.write_cached_companies([long_domain, "b.com"], companies)
+
+    assert "Could not cache the Tracxn response for" in caplog.text
+    assert app.read_cached_companies("b.com") == [companies[1]]
+    assert app.read_cached_companies(long_domain) is None
+
+
+def test_cache_is_disabled_without_home_directory(monkeypatch):
+    def no_home():
+        raise RuntimeError("Could not determine home directory.")
+
+    monkeypatch.setattr(app, "TRACXN_CACHE_DIR", None)
+    monkeypatch.setattr(app.Path, "home", no_home)
+
+    app.write_cached_companies(["a.com"], [{"name": "A", "domain": "a.com"}])
+    app.clear_cache()
+    assert app.split_cached(["a.com"]) == ([], ["a.com"])
+
+
+class FakeTracxnSession:
+    """
+    Stands in for the shared requests session: answers Tracxn searches and counts the requested domains.
+    """
+
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.requested = []
+
+    def post(self, url, headers=None, json=None, **kwargs):
+        domains = json["filter"]["domain"]
+        self.requested.append(domains)
+        response = app.requests.Response()
+        response.status_code = self.status_code
+        response._content = app.orjson.dumps({"result": [{"name": domain, "domain": domain} for domain in domains]})
+        return response
+
+
+def test_iter_companies_fetches_only_uncached_domains(cache_dir, monkeypatch):
+    session = FakeTracxnSession()
+    monkeypatch.setattr(app, "_session", session)
+    app.write_cached_companies(["a.com"], [{"name": "cached", "domain": "a.com"}])
+
+    companies = list(app.iter_companies(["a.com", "https://www.B.com"], "token"))
+
+    assert companies == [{"name": "cached", "domain": "a.com"}, {"name": "b.com", "domain": "b.com"}]
+    assert session.requested == [["b.com"]]
+    assert app.read_cached_companies("b.com") == [{"name": "b.com", "domain": "b.com"}]
+
+
+def test_iter_companies_raises_on_tracxn_errors(cache_dir, monkeypatch):
+    monkeypatch.setattr(app, "_session", FakeTracxnSession(status_code=404))
+
+    with pytest.raises(ValueError, match="Tracxn"):
+        list(app.iter_companies("a.com", "token"))
+
+
+class FakeIterCompanies:
+    """
+    Stands in for iter_companies: returns one company per URL and records how many chunks run at once.
+    """
+
+    def __init__(self, failing_url=None):
+        self.failing_url = failing_url
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, urls, tracxn_token):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Earlier chunks finish last, so results arrive out of order.
+            index = int(urls[0].removeprefix("company").removesuffix(".com"))
+            time.sleep(0.01 + 0.01 / (1 + index))
+            if self.failing_url in urls:
+                raise ValueError("Error in API request or Company not found in Tracxn Database")
+            return [{"domain": url} for url in urls]
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def test_request_data_batch_keeps_order_and_limits_requests_in_flight(monkeypatch):
+    fake = FakeIterCompanies()
+    monkeypatch.setattr(app, "iter_companies", fake)
+    urls = [f"company{i}.com" for i in range(50)]
+
+    companies = list(app.request_data_batch(urls, "token", chunk=2))
+
+    assert [company["domain"] for company in companies] == urls
+    assert 1 < fake.max_in_flight <= app.TRACXN_MAX_WORKERS
+
+
+def test_request_data_batch_raises_errors_from_a_chunk(monkeypatch):
+    monkeypatch.setattr(app, "iter_companies", FakeIterCompanies(failing_url="company7.com"))
+    urls = [f"company{i}.com" for i in range(20)]
+
+    with pytest.raises(ValueError, match="Tracxn"):
+        list(app.request_data_batch(urls, "token", chunk=2))
+
+
+def test_clear_cache_removes_cache_files(cache_dir):
+    app.write_cached_companies(["a.com", "b.com"], [{"domain": "a.com"}, {"domain": "b.com"}])
+
+    app.clear_cache()
+
+    assert list(cache_dir.iterdir()) == []
+
+
+requires_aiohttp = pytest.mark.skipif(app.aiohttp is None, reason="aiohttp is not installed")
+
+
+class FakeHttp:
+    """
+    Stands in for _request_async: serves Tracxn searches and records Airtable writes.
+    """
+
+    def __init__(self, failing_domain=None, airtable_status=200, tracxn_delay=0):
+        self.failing_domain = failing_domain
+        self.airtable_status = airtable_status
+        self.tracxn_delay = tracxn_delay
+        self.searches = 0
+        self.writes = []
+
+    async def __call__(self, session, method, url, json=None, **kwargs):
+        if url == app.TRACXN_COMPANIES_URL:
+            self.searches += 1
+            await app.asyncio.sleep(self.tracxn_delay)
+            domains = json["filter"]["domain"]
+            if self.failing_domain in domains:
+                await app.asyncio.sleep(0.05)
+                return 500, b""
+            return 200, app.orjson.dumps({"result": [{"name": domain, "domain": domain} for domain in domains]})
+
+        self.writes.append(json)
+        if self.airtable_status != 200:
+            return self.airtable_status, b'{"error": "rejected"}'
+        ids = [f"rec{i}" for i in range(len(json["records"]))]
+        records = [{"id": record_id, "fields": record["fields"]} for record_id, record in zip(ids, json["records"])]
+        return 200, app.orjson.dumps({"records": records, "createdRecords": ids, "updatedRecords": []})
+
+
+@pytest.fixture
+def table():
+    return app.Api("key").table("appTest", "tblTest")
+
+
+FIELD_NAMES = {"Name": "Name", "URL": "URL"}
+
+
+@requires_aiohttp
+def test_sync_companies_async_writes_in_batches_of_ten(cache_dir, table, monkeypatch):
+    http = FakeHttp()
+    monkeypatch.setattr(app, "_request_async", http)
+    urls = [f"company{i}.com" for i in range(45)]
+
+    added = app.asyncio.run(app.sync_companies_async(urls, table, FIELD_NAMES, "token", check_for_url=True))
+
+    assert added == 45
+    assert [len(write["records"]) for write in http.writes] == [10, 10, 10, 10, 5]
+    assert all(write["performUpsert"] == {"fieldsToMergeOn": ["URL"]} for write in http.writes)
+    assert sorted(record["fields"]["URL"] for write in http.writes for record in write["records"]) == sorted(urls)
+
+
+@requires_aiohttp
+def test_sync_companies_async_flushes_queued_records_when_a_fetch_fails(cache_dir, table, monkeypatch):
+    http = FakeHttp(failing_domain="broken.com")
+    monkeypatch.setattr(app, "_request_async", http)
+    # 15 records leave a partial batch of 5 in the writer when the second chunk fails.
+    monkeypatch.setattr(app, "TRACXN_BATCH_SIZE", 15)
+    urls = [f"company{i}.com" for i in range(15)] + ["broken.com"]
+
+    with pytest.raises(ValueError, match="Tracxn"):
+        app.asyncio.run(app.sync_companies_async(urls, table, FIELD_NAMES, "token", check_for_url=True))
+
+    written = [record["fields"]["URL"] for write in http.writes for record in write["records"]]
+    assert sorted(written) == sorted(urls[:15])
+
+
+@requires_aiohttp
+def test_sync_companies_async_raises_on_airtable_errors(cache_dir, table, monkeypatch):
+    monkeypatch.setattr(app, "_request_async", FakeHttp(airtable_status=403))
+
+    with pytest.raises(ValueError, match="Error writing to Airtable"):
+        app.asyncio.run(app.sync_companies_async(["a.com"], table, FIELD_NAMES, "token"))
+
+
+@requires_aiohttp
+def test_sync_companies_async_stops_fetching_when_a_write_fails(cache_dir, table, monkeypatch):
+    http = FakeHttp(airtable_status=403, tracxn_delay=0.05)
+    monkeypatch.setattr(app, "_request_async", http)
+    urls = [f"company{i}.com" for i in range(80 * app.TRACXN_BATCH_SIZE)]
+
+    with pytest.raises(ValueError, match="Error writing to Airtable"):
+        app.asyncio.run(app.sync_companies_async(urls, table, FIELD_NAMES, "token"))
+
+    assert len(http.writes) == 1
+    # Fetches already in flight may finish, but most of the 80 chunks must never be requested.
+    assert http.searches < 40
+
+
+@requires_aiohttp
+def test_sync_companies_async_keeps_the_fetch_error_when_the_flush_also_fails(cache_dir, table, monkeypatch):
+    http = FakeHttp(failing_domain="broken.com", airtable_status=403)
+    monkeypatch.setattr(app, "_request_async", http)
+    # Five records stay queued until the failed fetch triggers the flush, which Airtable rejects too.
+    monkeypatch.setattr(app, "TRACXN_BATCH_SIZE", 5)
+    urls = [f"company{i}.com" for i in range(5)] + ["broken.com"]
+
+    with pytest.raises(ValueError, match="Tracxn"):
+        app.asyncio.run(app.sync_companies_async(urls, table, FIELD_NAMES, "token"))
+
+    assert len(http.writes) == 1
+
+
+class FakeResponse:
+    def __init__(self, status, body=b"", headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def read(self):
+        return self.body
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+@requires_aiohttp
+def test_request_async_retries_rate_limited_requests(monkeypatch):
+    monkeypatch.setattr(app, "ASYNC_BACKOFF_FACTOR", 0)
+    session = FakeSession([FakeResponse(429, headers={"Retry-After": "0"}), FakeResponse(503), FakeResponse(200, b"{}")])
+
+    assert app.asyncio.run(app._request_async(session, "PATCH", "https://api.airtable.com/v0/app/tbl")) == (200, b"{}")
+    assert session.calls == 3
+
+
+@requires_aiohttp
+def test_request_async_returns_last_response_when_retries_run_out(monkeypatch):
+    monkeypatch.setattr(app, "ASYNC_BACKOFF_FACTOR", 0)
+    monkeypatch.setattr(app, "ASYNC_MAX_RETRIES", 1)
+    session = FakeSession([FakeResponse(500), FakeResponse(502, b"bad gateway")])
+
+    assert app.asyncio.run(app._request_async(session, "POST", app.TRACXN_COMPANIES_URL)) == (502, b"bad gateway")
+
+
+ALL_FIELDS = {field: field for field in app._FIELD_PROCESSORS}
+
+
+def test_extract_data_on_empty_company():
+    assert list(app.extract_data({"result": [{}]}, ALL_FIELDS)) == [{
+        "Name": "",
+        "Logo": [],
+        "Short Description": None,
+        "Long Description": None,
+        "Headquaters": "",
+        "Founded Year": None,
+        "Employee Count": None,
+        "URL": "",
+    }]
+
+
+@pytest.mark.parametrize(("logos", "expected"), [
+    ({"imageUrl": "https://tracxn.com/logo.png"}, [{"url": "https://tracxn.com/logo.png"}]),
+    ({"imageUrl": None}, []),
+    ({}, []),
+    (None, []),
+])
+def test_extract_data_builds_logo_attachments(logos, expected):
+    [record] = app.extract_data([{"logos": logos}], {"Logo": "Logo"})
+
+    assert record == {"Logo": expected}
+
+
+def test_prepare_upserts_drops_empty_values_and_records_without_url():
+    records = [
+        {"Name": "A", "URL": "a.com", "Logo": [], "Short Description": None, "Headquaters": "", "Employee Count": 0},
+        {"Name": "No URL", "URL": ""},
+    ]
+
+    assert list(app.prepare_upserts(records, FIELD_NAMES)) == [{"Name": "A", "URL": "a.com", "Employee Count": 0}]
+
+
+MULTIPLE_MATCHES_ERROR = b'{"error": {"type": "INVALID_REQUEST_MULTIPLE_MATCHES", "message": "More than one record matches the fields to merge on"}}'
+UNKNOWN_FIELD_ERROR = b'{"error": {"type": "UNKNOWN_FIELD_NAME", "message": "Unknown field name: \\"Nmae\\""}}'
+
+
+class FakeTable:
+    """
+    Records batch_upsert calls; rows whose URL is in rejected_urls make Airtable reject the request with error_body.
+    """
+
+    def __init__(self, rejected_urls=(), error_body=MULTIPLE_MATCHES_ERROR):
+        self.rejected_urls = set(rejected_urls)
+        self.error_body = error_body
+        self.calls = 0
+        self.upserts = []
+
+    def batch_upsert(self, records, key_fields, typecast):
+        self.calls += 1
+        if any(record["fields"][key_fields[0]] in self.rejected_urls for record in records):
+            response = app.requests.Response()
+            response.status_code = 422
+            response._content = self.error_body
+            raise app.requests.exceptions.HTTPError("422 Client Error", response=response)
+        self.upserts.append([record["fields"] for record in records])
+        ids = [f"rec{len(self.upserts)}-{i}" for i in range(len(records))]
+        return {
+            "records": [{"id": record_id, "fields": record["fields"]} for record_id, record in zip(ids, records)],
+            "createdRecords": ids,
+            "updatedRecords": [],
+        }
+
+
+def test_add_data_to_table_does_not_upsert_empty_companies():
+    fake_table = FakeTable()
+    records = app.extract_data({"result": [{}, {"name": "A", "domain": "a.com"}]}, ALL_FIELDS)
+
+    assert app.add_data_to_table(records, fake_table, ALL_FIELDS, check_for_url=True) == 1
+    assert fake_table.upserts == [[{"Name": "A", "URL": "a.com"}]]
+
+
+def test_add_data_to_table_isolates_rejected_upserts(caplog):
+    fake_table = FakeTable(rejected_urls={"dup.com"})
+    records = [{"Name": name, "URL": f"{name}.com"} for name in ("a", "dup", "b")]
+
+    assert app.add_data_to_table(records, fake_table, FIELD_NAMES, check_for_url=True) == 2
+    assert fake_table.upserts == [[{"Name": "a", "URL": "a.com"}], [{"Name": "b", "URL": "b.com"}]]
+    assert "Could not upsert dup.com" in caplog.text
+
+
+def test_add_data_to_table_raises_other_validation_errors():
+    records = [{"Name": f"company{i}", "URL": f"company{i}.com"} for i in range(20)]
+    fake_table = FakeTable(rejected_urls={record["URL"] for record in records}, error_body=UNKNOWN_FIELD_ERROR)
+
+    with pytest.raises(app.requests.exceptions.HTTPError):
+        app.add_data_to_table(records, fake_table, FIELD_NAMES, check_for_url=True)
+    assert fake_table.calls == 1
+
+
+@requires_aiohttp
+def test_add_data_to_table_async_isolates_rejected_upserts(table, monkeypatch, caplog):
+    async def fake_request(session, method, url, json=None, **kwargs):
+        if any(record["fields"]["URL"] == "dup.com" for record in json["records"]):
+            return 422, MULTIPLE_MATCHES_ERROR
+        return 200, app.orjson.dumps({"records": json["records"], "createdRecords": ["rec"] * len(json["records"]), "updatedRecords": []})
+
+    monkeypatch.setattr(app, "_request_async", fake_request)
+    records = [{"Name": name, "URL": f"{name}.com"} for name in ("a", "dup", "b")]
+
+    added = app.asyncio.run(app.add_data_to_table_async(None, records, table, FIELD_NAMES, check_for_url=True))
+
+    assert added == 2
+    assert "Could not upsert dup.com" in caplog.text
+
+
+@requires_aiohttp
+def test_add_data_to_table_async_raises_other_validation_errors(table, monkeypatch):
+    calls = []
+
+    async def fake_request(session, method, url, json=None, **kwargs):
+        calls.append(json)
+        return 422, UNKNOWN_FIELD_ERROR
+
+    monkeypatch.setattr(app, "_request_async", fake_request)
+    records = [{"Name": f"company{i}", "URL": f"company{i}.com"} for i in range(10)]
+
+    with pytest.raises(ValueError, match="UNKNOWN_FIELD_NAME"):
+        app.asyncio.run(app.add_data_to_table_async(None, records, table, FIELD_NAMES, check_for_url=True))
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("url", [
+    "https://airtable.com/appAbc123/tblDef456",
+    "https://airtable.com/appAbc123/tblDef456/viwGhi789?blocks=hide",
+])
+def test_extract_keys_returns_base_and_table_ids(url):
+    assert app.extract_keys(url) == ("appAbc123", "tblDef456")
+
+
+@pytest.mark.parametrize("url", [
+    "https://airtable.com/appAbc123/viwGhi789",
+    "https://airtable.com/appAbc123",
+    "https://example.com/appAbc123/tblDef456",
+])
+def test_extract_keys_rejects_urls_without_table_id(url):
+    assert app.extract_keys(url) == (None, None)
+
+
+@pytest.mark.parametrize("url", [
+    "example.com",
+    "www.example.com",
+    "https://www.example.com",
+    "http://example.com:8080/about",
+    "example.com:443",
+    "  https://example.com/  \n",
+    "HTTPS://WWW.Example.COM/Path",
+    "https://example.com?ref=tracxn",
+    "example.com#team",
+])
+def test_simplify_url_reduces_urls_to_the_domain(url):
+    assert app.simplify_url(url) == "example.com"
+
+
+def test_simplify_url_keeps_subdomains_other_than_www():
+    assert app.simplify_url("https://blog.example.com/post") == "blog.example.com"
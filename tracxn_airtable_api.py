@@ -8,37 +8,97 @@ Requirements:
    a. "fields": Maps the data fields from Tracxn to the corresponding fields in Airtable.
       - Data with no corresponding field in Airtable will be ignored.
       - Fields not provided by Tracxn will remain empty in Airtable.
-   b. "links": Contains URLs for the Airtable base/table and the target company.
+   b. "links": Contains URLs for the Airtable base/table and the target company (or a list of companies).
 
 2. Save your Tracxn API token as an environment variable (named 'API_KEY_TRACXN').
 3. Save your Airtable API token with write permissions as an environment variable (named 'API_KEY_AIRTABLE').
 
 Features:
 1. Import any available company data from Tracxn into your Airtable tables (matching columns required) using the company URL.
-2. Prevent duplicate imports of the same company data.
+2. Prevent duplicate imports of the same company data (existing rows are updated in place).
 
 Future Enhancements:
 1. Additional methods for importing companies.
 2. Support for more data fields (e.g., categories).
 
 Notes:
-- The program checks for the existence of data and fields before importing to avoid duplicates.
+- Rows are matched on the URL field when importing, so existing entries are updated rather than duplicated.
 - Ensure that the Airtable base has the necessary schema to accommodate the data being imported.
 """
 
 # Import necessary libraries
-from pyairtable import Api, utils     # Airtable library for Python requests.
+from pyairtable import Api            # Airtable library for Python requests.
 import requests                        # HTTP library for making calls to the Tracxn API.
+from requests.adapters import HTTPAdapter  # Connection pooling for the shared Tracxn session.
+from urllib3.util.retry import Retry   # Retry policy for transient Tracxn API errors.
 import os                              # To retrieve API tokens stored as system variables.
-import json                            # For parsing and formatting JSON data from Tracxn.
-from urllib.parse import urlparse      # Utility for formatting company URLs for Tracxn searches.
+import orjson                          # Fast JSON parsing for Tracxn responses and the config file.
 import re                              # Regular expression library for pattern matching in URLs.
 import logging                         # Logging library for tracking events and errors.
-
-
+from concurrent.futures import ThreadPoolExecutor  # Runs Tracxn requests for several companies concurrently.
+from collections import deque          # Window of in-flight Tracxn requests.
+from itertools import islice           # Cuts record streams into Airtable-sized batches.
+import functools                       # Caches the API objects so setup runs once per process.
+import asyncio                         # Event loop for the pipelined Tracxn/Airtable mode.
+import time                            # Checks the age of cached Tracxn responses.
+from pathlib import Path               # Locates the on-disk Tracxn cache.
+import argparse                        # Command line options.
+try:
+    import aiohttp                     # Optional async HTTP client; enables the pipelined mode when installed.
+except ImportError:
+    aiohttp = None
+
+
+TRACXN_COMPANIES_URL = "https://tracxn.com/api/2.2/companies"
+TRACXN_MAX_WORKERS = 8                  # Number of Tracxn requests kept in flight at once.
+TRACXN_BATCH_SIZE = 20                  # Number of domains sent in a single Tracxn request.
+TRACXN_CACHE_DIR = None                 # Directory of the Tracxn response cache; None means ~/.cache/tracxn_airtable.
+TRACXN_CACHE_TTL = 7 * 24 * 60 * 60     # Seconds a cached Tracxn response stays fresh.
+ASYNC_CONNECTION_LIMIT = 16             # Size of the aiohttp connection pool shared by both APIs.
+ASYNC_MAX_CONCURRENCY = 8               # Tracxn requests in flight at once in the pipelined mode.
+ASYNC_QUEUE_SIZE = 5 * 10               # Records buffered between Tracxn fetches and Airtable writes (five batches).
+ASYNC_RETRY_STATUSES = {429, 500, 502, 503, 504}  # Responses retried in the pipelined mode (both APIs).
+ASYNC_MAX_RETRIES = 5                   # Attempts after the first one; with the backoff below this covers Airtable's 30 s rate-limit penalty.
+ASYNC_BACKOFF_FACTOR = 1.0              # Retry delays grow as factor * 2 ** attempt seconds unless Retry-After says otherwise.
+
+# Matches the base key and table key in an Airtable URL (view IDs are ignored).
+_AIRTABLE_URL_RE = re.compile(r'https://airtable\.com/(app[\w\d]+)/(tbl[\w\d]+)')
+# Captures the host of a URL, skipping an optional scheme and 'www.' prefix.
+_DOMAIN_RE = re.compile(r'^(?:[a-z][a-z0-9+.\-]*://)?(?:www\.)?([^:/?#]+)', re.I)
+
+# Shared session so repeated Tracxn calls reuse pooled TCP/TLS connections.
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=None,          # The companies search is a read-only POST, so it is safe to retry.
+        raise_on_status=False,         # Let iter_companies report the final status code itself.
+    ),
+))
+
+# Maps each supported Tracxn field to a function extracting its Airtable value from a company record.
+# Missing data yields None (or an empty value) instead of raising.
+_FIELD_PROCESSORS = {
+    "Name": lambda c: c.get('name', ''),
+    "Logo": lambda c: [{"url": c['logos']['imageUrl']}] if (c.get('logos') or {}).get('imageUrl') else [],
+    "Short Description": lambda c: (c.get('description') or {}).get('short'),
+    "Long Description": lambda c: (c.get('description') or {}).get('long'),
+    "Headquaters": lambda c: ", ".join(filter(None, [(c.get('location') or {}).get(k, '') for k in ('city', 'country', 'continent')])),
+    "Founded Year": lambda c: str(c['foundedYear']) + "-01-01" if c.get('foundedYear') else None,
+    "Employee Count": lambda c: (c.get('latestEmployeeCount') or {}).get('value'),
+    "URL": lambda c: c.get('domain', '')
+}
+
+
+@functools.lru_cache(maxsize=1)
 def getAirtableAPI() -> Api:
     """
     Retrieves the Airtable API key from environment variables and returns an Api object.
+    The object is cached, so its connection pool is shared by every later call.
     Raises a ValueError if the API key is not found.
     """
     airtable_key = os.getenv("API_KEY_AIRTABLE")
@@ -48,20 +108,20 @@ def getAirtableAPI() -> Api:
         raise ValueError("No Airtable API token found in OS. Please save the token under 'API_KEY_AIRTABLE'")
 
 
+@functools.lru_cache(maxsize=None)
 def getAirtableTable(fBaseKey: str, fTableKey: str, api: Api) -> Api.table:
     """
     Retrieves a specific table from Airtable using base key and table key.
-    Raises a ValueError if the table is not found.
+    Tables are cached per (base key, table key, api).
+    The keys are validated when the configuration is loaded (see extract_keys).
     """
-    try:
-        return api.table(fBaseKey, fTableKey)
-    except:
-        raise ValueError("Table not found. Please check the Base Key and the Table Key")
+    return api.table(fBaseKey, fTableKey)
     
 
+@functools.lru_cache(maxsize=1)
 def getTraxcnToken() -> str:
     """
-    Retrieves the Tracxn API token from environment variables.
+    Retrieves the Tracxn API token from environment variables (read once and cached).
     Raises a ValueError if the API token is not found or set to 'none'.
     """
     tracxn_token = os.getenv("API_KEY_TRACXN")
@@ -71,90 +131,272 @@ def getTraxcnToken() -> str:
         raise ValueError("No Tracxn API token found in OS. Please save the token under 'API_KEY_TRACXN'")
     
 
-def request_data(url: str, tracxn_token: str) -> dict:
+def _cache_dir():
+    """
+    Returns the Tracxn cache directory, resolving the default location on first use.
+    Returns None if no home directory can be determined, which disables the cache.
+    """
+    if TRACXN_CACHE_DIR is not None:
+        return TRACXN_CACHE_DIR
+    try:
+        return Path.home() / ".cache" / "tracxn_airtable"
+    except RuntimeError:
+        return None
+
+
+def read_cached_companies(domain: str):
+    """
+    Returns the cached Tracxn company records for a domain (as returned by simplify_url),
+    or None if there is no fresh cache entry.
+    """
+    cache_dir = _cache_dir()
+    if cache_dir is None:
+        return None
+    cache_path = cache_dir / f"{domain}.json"
+    try:
+        if time.time() - cache_path.stat().st_mtime < TRACXN_CACHE_TTL:
+            return orjson.loads(cache_path.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        pass
+    return None
+
+
+def write_cached_companies(domains: list, companies: list):
+    """
+    Stores Tracxn company records in the on-disk cache, one file per requested domain (as returned by simplify_url).
+    Companies are assigned to a domain by their 'domain' field; if only one domain was
+    requested, all companies belong to it. Domains without results are not cached.
+    The cache is only an optimisation, so write failures are logged and otherwise ignored.
+    """
+    cache_dir = _cache_dir()
+    if cache_dir is None:
+        return
+
+    by_domain = {domain: [] for domain in domains}
+    for company in companies:
+        domain = domains[0] if len(domains) == 1 else simplify_url(company.get('domain') or '')
+        if domain in by_domain:
+            by_domain[domain].append(company)
+
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        logging.warning(f"Could not create the Tracxn cache directory {cache_dir}: {e}")
+        return
+    for domain, domain_companies in by_domain.items():
+        if domain_companies:
+            try:
+                (cache_dir / f"{domain}.json").write_bytes(orjson.dumps(domain_companies))
+            except OSError as e:
+                logging.warning(f"Could not cache the Tracxn response for {domain}: {e}")
+
+
+def split_cached(urls) -> tuple:
+    """
+    Splits URLs into the cached company records and the domains that still have to be requested.
+    Returns a tuple (cached_companies, missing_domains).
+    """
+    cached_companies, missing_domains = [], []
+    for domain in dict.fromkeys(simplify_url(url) for url in urls):
+        cached = read_cached_companies(domain)
+        if cached is None:
+            missing_domains.append(domain)
+        else:
+            cached_companies.extend(cached)
+    return cached_companies, missing_domains
+
+
+def clear_cache():
+    """
+    Removes all cached Tracxn responses, so the next requests refetch them.
+    """
+    cache_dir = _cache_dir()
+    if cache_dir is None:
+        return
+    for cache_path in cache_dir.glob("*.json"):
+        try:
+            cache_path.unlink(missing_ok=True)
+        except OSError as e:
+            logging.warning(f"Could not remove the cached Tracxn response {cache_path}: {e}")
+
+
+def iter_companies(urls, tracxn_token: str):
     """
-    Requests data from the Tracxn API using the provided URL and token.
-    Returns the JSON response.
+    Yields the company records matching the provided URL (or list of URLs) from the Tracxn API.
+    Domains with a fresh cache entry are served from disk; the rest are sent in a single request.
+    The response is parsed at once with orjson; it holds at most one chunk of companies (see request_data_batch).
     Raises an exception if the company is not found or if an error occurs.
     """
+    if isinstance(urls, str):
+        urls = [urls]
+
+    cached_companies, missing_domains = split_cached(urls)
+    yield from cached_companies
+    if not missing_domains:
+        return
+
     request_body = {
-        "filter":{"domain":[simplify_url(url)]}
+        "filter":{"domain":missing_domains}
     }
 
-    result = requests.post("https://tracxn.com/api/2.2/companies", headers={'accessToken': tracxn_token}, json=request_body)
-
+    result = _session.post(TRACXN_COMPANIES_URL, headers={'accessToken': tracxn_token}, json=request_body)
     if result.status_code != 200:
         raise ValueError("Error in API request or Company not found in Tracxn Database")
-    else:
-        return result.json()
+
+    fetched = orjson.loads(result.content).get("result", [])
+    write_cached_companies(missing_domains, fetched)
+    yield from fetched
+
+
+def request_data_batch(urls: list, tracxn_token: str, chunk: int = TRACXN_BATCH_SIZE):
+    """
+    Requests data for several companies from the Tracxn API, sending up to `chunk` domains per request.
+    The requests are run concurrently on the shared session, with at most TRACXN_MAX_WORKERS in flight,
+    so only that many responses are held in memory at once.
+    Yields the company records in request order.
+    """
+    def fetch(urls_chunk):
+        return list(iter_companies(urls_chunk, tracxn_token))
+
+    chunks = (urls[i:i + chunk] for i in range(0, len(urls), chunk))
+    with ThreadPoolExecutor(max_workers=TRACXN_MAX_WORKERS) as executor:
+        pending = deque(executor.submit(fetch, urls_chunk) for urls_chunk in islice(chunks, TRACXN_MAX_WORKERS))
+        while pending:
+            companies = pending.popleft().result()
+            for urls_chunk in islice(chunks, 1):
+                pending.append(executor.submit(fetch, urls_chunk))
+            yield from companies
 
 
 def simplify_url(url: str) -> str:
     """
     Simplifies a given URL to its domain name.
-    Removes 'www.' and any port numbers, and ensures the URL has a scheme.
+    Removes surrounding whitespace, the scheme, 'www.', any port number and path. Scheme-less URLs are accepted.
+    The domain is lowercased, so it can be used as a cache and deduplication key.
     """
+    url = url.strip().lower()
+    match = _DOMAIN_RE.match(url)
+    return match.group(1) if match else url
+
 
-    parsed_url = urlparse(url, scheme='http')
-    domain = parsed_url.netloc
 
-    if domain.startswith('www.'):
-        domain = domain[4:]
+AIRTABLE_BATCH_SIZE = 10                # Maximum number of records Airtable accepts per create request.
+
+
+def prepare_upserts(records, field_names: dict):
+    """
+    Yields the fields to upsert for each record.
+    Empty values (None, '' or []) are dropped so they do not overwrite data already in the row,
+    and records without a URL are skipped, since they would all merge into the same row.
+    """
+    url_field = field_names["URL"]
+    for record in records:
+        fields = {name: value for name, value in record.items() if value is not None and value != '' and value != []}
+        if fields.get(url_field):
+            yield fields
+        else:
+            logging.warning(f"Skipping {record.get(field_names.get('Name'), 'company')}: Tracxn returned no URL to match existing rows on.")
+
 
-    domain = domain.split(':')[0]
+def is_multiple_matches_error(body: bytes) -> bool:
+    """
+    Tells whether an Airtable 422 response body reports that an upsert matched several rows on the merge field.
+    Other 422s (unknown field names, invalid values, ...) are configuration or data errors and must not be retried.
+    """
+    try:
+        error = orjson.loads(body or b"{}").get("error")
+    except (orjson.JSONDecodeError, AttributeError):
+        return False
+    if not isinstance(error, dict):
+        return False
+    error_type = str(error.get("type", "")).upper()
+    message = str(error.get("message", "")).lower()
+    return ("MULTIPLE" in error_type and "MATCH" in error_type) or "more than one record" in message or "multiple records" in message
 
-    return domain
 
+def _log_upsert_failure(url: str, error):
+    """
+    Logs a record Airtable refused to upsert, pointing at duplicate URLs as the likely cause.
+    """
+    logging.error(
+        f"Could not upsert {url}: {error}. "
+        "If the table already contains several rows with this URL, remove the duplicates and run the import again."
+    )
 
 
-def add_data_to_table(data_dict: dict, table: Api.table, field_names: dict, check_for_url: bool = False):
+def upsert_batch(table: Api.table, batch: list, url_field: str) -> int:
     """
-    Adds data to the specified table.
-    If check_for_url is True, checks for the existence of the URL in the table before adding.
-    Returns True if data is added, False otherwise.
+    Upserts a batch of prepared records on the URL field and logs the rows that were updated.
+    If Airtable rejects the batch because several rows share a URL, the records are retried
+    one by one so only the offending ones are lost, and each failure is logged. Any other error is raised.
+    Returns the number of records created.
     """
+    try:
+        result = table.batch_upsert([{"fields": fields} for fields in batch], key_fields=[url_field], typecast=True)
+    except requests.exceptions.HTTPError as e:
+        if e.response is None or e.response.status_code != 422 or not is_multiple_matches_error(e.response.content):
+            raise
+        if len(batch) == 1:
+            _log_upsert_failure(batch[0][url_field], e)
+            return 0
+        logging.warning(f"Airtable rejected a batch of {len(batch)} upserts ({e}); retrying them one by one.")
+        return sum(upsert_batch(table, [fields], url_field) for fields in batch)
+
+    updated = set(result["updatedRecords"])
+    for record in result["records"]:
+        if record["id"] in updated:
+            logging.info(f"{record['fields'].get(url_field)} has already been fed to the table, updated it.")
+    return len(result["createdRecords"])
+
+
+def add_data_to_table(records, table: Api.table, field_names: dict, check_for_url: bool = False) -> int:
+    """
+    Adds one record (dict) or an iterable of records to the specified table.
+    Records are consumed and sent in batches of AIRTABLE_BATCH_SIZE to save round-trips.
+    If check_for_url is True, records are upserted on the URL field: Airtable updates rows
+    whose URL already exists instead of creating duplicates, within the same request.
+    Only non-empty values are written in that case (see prepare_upserts).
+    Returns the number of records added.
+    """
+    if isinstance(records, dict):
+        records = [records]
+    records = iter(records)
+
     if not check_for_url:
-        table.create(data_dict)
-        return True
-    
-    
-    table_content = table.all()
-    for row in table_content:
-        if field_names["URL"] in row["field"] and row["fields"][field_names["URL"]] ==data_dict[field_names["URL"]]:
-            logging.info(f"{row['fields'][field_names['URL']]} has already been fed to the table.")
-            return False
-    
-    table.create(data_dict)
-    return True
-
-
-
-def extract_data(json_file, field_names):
-    """
-    Extracts data from a given JSON file based on specified field names.
-    Returns a dictionary with the extracted data.
-    """
-    data_dict = dict()
-    for company in json_file.get("result", []):
-        for field, airtable_field in field_names.items():
-            if airtable_field:
-                try:
-                    field_processor = {
-                        "Name": lambda c: c.get('name', ''),
-                        "Logo": lambda c: (utils.attachment(c['logos']['imageUrl']) if c['logos']['imageUrl'] else [],),
-                        "Short Description": lambda c: c['description']['short'],
-                        "Long Description": lambda c: c['description']['long'],
-                        "Headquaters": lambda c: ", ".join([c['location']['city'], c['location']['country'], c['location']['continent']]),
-                        "Founded Year": lambda c: str(c['foundedYear']) + "-01-01",
-                        "Employee Count": lambda c: c['latestEmployeeCount']['value'],
-                        "URL": lambda c: c.get('domain', '')
-                    }
-                    if field in field_processor:
-                        data_dict[airtable_field] = field_processor[field](company)
-                except Exception as e:
-                    logging.error(f"Error processing field {field}: {e}")
-                    data_dict[field_names[field]] = None
-    return data_dict
+        created = 0
+        while batch := list(islice(records, AIRTABLE_BATCH_SIZE)):
+            table.batch_create(batch, typecast=True)
+            created += len(batch)
+        return created
+
+    url_field = field_names["URL"]
+    records = prepare_upserts(records, field_names)
+    created = 0
+    while batch := list(islice(records, AIRTABLE_BATCH_SIZE)):
+        created += upsert_batch(table, batch, url_field)
+    return created
+
+
+
+def extract_data(companies, field_names):
+    """
+    Extracts data from Tracxn company records based on specified field names.
+    Accepts a full Tracxn response or an iterable of companies (e.g. iter_companies).
+    Yields one dictionary with the extracted data per company.
+    """
+    if isinstance(companies, dict):
+        companies = companies.get("result", [])
+
+    # Resolve the processor of every mapped field once, so the per-company loop only calls them.
+    processors_get = _FIELD_PROCESSORS.get
+    processors = []
+    for field, airtable_field in field_names.items():
+        proc = processors_get(field)
+        if airtable_field and proc is not None:
+            processors.append((airtable_field, proc))
+
+    for company in companies:
+        yield {airtable_field: proc(company) for airtable_field, proc in processors}
 
 
 def extract_keys(url: str) -> tuple:
@@ -162,8 +404,7 @@ def extract_keys(url: str) -> tuple:
     Extracts base key and table key from an Airtable URL using regex.
     Returns a tuple (baseKey, tableKey). If no match is found, returns (None, None).
     """
-    pattern = r'https://airtable.com/(app[\w\d]+)/([\w\d]+)/'
-    match = re.search(pattern, url)
+    match = _AIRTABLE_URL_RE.search(url)
 
     if match:
         baseKey, tableKey = match.groups()
@@ -173,13 +414,193 @@ def extract_keys(url: str) -> tuple:
 
 
 
-def main():
+async def _request_async(session, method: str, url: str, **kwargs) -> tuple:
+    """
+    Sends a request with aiohttp, retrying ASYNC_RETRY_STATUSES responses and connection errors
+    with exponential backoff (honouring Retry-After). This mirrors the urllib3 Retry of the Tracxn
+    session and pyairtable's retry on Airtable 429s in the synchronous path.
+    Returns a tuple (status, body) of the final response.
+    """
+    for attempt in range(ASYNC_MAX_RETRIES + 1):
+        retry_after = None
+        try:
+            async with session.request(method, url, **kwargs) as result:
+                body = await result.read()
+                if result.status not in ASYNC_RETRY_STATUSES or attempt == ASYNC_MAX_RETRIES:
+                    return result.status, body
+                retry_after = result.headers.get("Retry-After")
+                reason = f"status {result.status}"
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if attempt == ASYNC_MAX_RETRIES:
+                raise
+            reason = repr(e)
+
+        delay = float(retry_after) if retry_after and retry_after.isdigit() else ASYNC_BACKOFF_FACTOR * 2 ** attempt
+        logging.warning(f"{method} {url} failed ({reason}), retrying in {delay:g}s.")
+        await asyncio.sleep(delay)
+
+
+def _table_url(table: Api.table) -> str:
+    """
+    Returns the records endpoint of the table (Table.url in pyairtable 2.x, Table.urls.records in 3.x).
+    """
+    urls = getattr(table, "urls", None)
+    return str(urls.records) if urls is not None else table.url
+
+
+async def request_data_async(session, semaphore: asyncio.Semaphore, urls: list, tracxn_token: str) -> list:
+    """
+    Coroutine version of iter_companies: requests the companies for a chunk of URLs from the Tracxn API.
+    Domains with a fresh cache entry are served from disk; at most one request per semaphore slot is in flight.
+    Returns the list of company records.
+    Raises an exception if the company is not found or if an error occurs.
+    """
+    # The cache is read and written in a worker thread so file I/O does not block the event loop.
+    cached_companies, missing_domains = await asyncio.to_thread(split_cached, urls)
+    if not missing_domains:
+        return cached_companies
+
+    request_body = {
+        "filter":{"domain":missing_domains}
+    }
+
+    async with semaphore:
+        status, body = await _request_async(session, "POST", TRACXN_COMPANIES_URL, headers={'accessToken': tracxn_token}, json=request_body)
+    if status != 200:
+        raise ValueError("Error in API request or Company not found in Tracxn Database")
+    fetched = orjson.loads(body).get("result", [])
+
+    await asyncio.to_thread(write_cached_companies, missing_domains, fetched)
+    return cached_companies + fetched
+
+
+async def add_data_to_table_async(session, records: list, table: Api.table, field_names: dict, check_for_url: bool = False) -> int:
+    """
+    Coroutine version of add_data_to_table for at most AIRTABLE_BATCH_SIZE records.
+    Writes through the Airtable REST API directly; with check_for_url, the records are upserted on the URL field
+    the same way as in add_data_to_table (empty values dropped, batches rejected for duplicate URLs retried one by one).
+    Returns the number of records added.
+    """
+    method = "POST"
+    if check_for_url:
+        records = list(prepare_upserts(records, field_names))
+        if not records:
+            return 0
+        method = "PATCH"
+
+    request_body = {"records": [{"fields": record} for record in records], "typecast": True}
+    if check_for_url:
+        request_body["performUpsert"] = {"fieldsToMergeOn": [field_names["URL"]]}
+
+    headers = {"Authorization": f"Bearer {table.api.api_key}"}
+    status, body = await _request_async(session, method, _table_url(table), headers=headers, json=request_body)
+    if check_for_url and status == 422 and is_multiple_matches_error(body):
+        error = body.decode(errors="replace")
+        if len(records) == 1:
+            _log_upsert_failure(records[0][field_names["URL"]], error)
+            return 0
+        logging.warning(f"Airtable rejected a batch of {len(records)} upserts ({error}); retrying them one by one.")
+        added = 0
+        for record in records:
+            added += await add_data_to_table_async(session, [record], table, field_names, check_for_url)
+        return added
+    if status != 200:
+        raise ValueError(f"Error writing to Airtable: {body.decode(errors='replace')}")
+
+    response = orjson.loads(body)
+    if check_for_url:
+        return len(response.get("createdRecords", []))
+    return len(response.get("records", []))
+
+
+async def sync_companies_async(company_urls: list, table: Api.table, field_names: dict, tracxn_token: str, check_for_url: bool = False) -> int:
+    """
+    Fetches the companies from Tracxn and writes them to Airtable on one event loop.
+    Tracxn requests (producers) feed an asyncio.Queue that a single writer drains in
+    batches of AIRTABLE_BATCH_SIZE, so Airtable writes overlap with the remaining fetches.
+    The queue is bounded (ASYNC_QUEUE_SIZE), so fetches pause while writes are rate-limited.
+    If a fetch fails, the other fetches are cancelled but the records already queued are
+    still written before that error is raised. If a write fails, the fetches are cancelled
+    and the write error is raised straight away.
+    Returns the number of records added.
+    """
+    queue = asyncio.Queue(maxsize=ASYNC_QUEUE_SIZE)
+    connector = aiohttp.TCPConnector(limit=ASYNC_CONNECTION_LIMIT)
+    async with aiohttp.ClientSession(connector=connector, json_serialize=lambda obj: orjson.dumps(obj).decode()) as session:
+        semaphore = asyncio.Semaphore(ASYNC_MAX_CONCURRENCY)
+
+        async def produce(urls):
+            companies = await request_data_async(session, semaphore, urls, tracxn_token)
+            for record in extract_data(companies, field_names):
+                await queue.put(record)
+
+        async def consume():
+            added = 0
+            batch = []
+            while True:
+                record = await queue.get()
+                if record is None:
+                    break
+                batch.append(record)
+                if len(batch) == AIRTABLE_BATCH_SIZE:
+                    added += await add_data_to_table_async(session, batch, table, field_names, check_for_url)
+                    batch = []
+            if batch:
+                added += await add_data_to_table_async(session, batch, table, field_names, check_for_url)
+            return added
+
+        async def cancel(tasks):
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        consumer = asyncio.create_task(consume())
+        chunks = [company_urls[i:i + TRACXN_BATCH_SIZE] for i in range(0, len(company_urls), TRACXN_BATCH_SIZE)]
+        producers = [asyncio.create_task(produce(chunk)) for chunk in chunks]
+        fetching = asyncio.gather(*producers)
+        try:
+            # The writer only finishes after the sentinel below, so if it is done here, it failed.
+            await asyncio.wait([consumer, fetching], return_when=asyncio.FIRST_COMPLETED)
+            if consumer.done():
+                await cancel([fetching, *producers])
+                return consumer.result()
+
+            fetch_error = fetching.exception()
+            if fetch_error is not None:
+                await cancel(producers)
+
+            # Flush the records that were queued, even if a fetch failed.
+            sentinel = asyncio.create_task(queue.put(None))
+            await asyncio.wait([sentinel, consumer], return_when=asyncio.FIRST_COMPLETED)
+            sentinel.cancel()
+            try:
+                added = await consumer
+            except Exception as e:
+                if fetch_error is None:
+                    raise
+                logging.error(f"Error writing the queued records to Airtable: {e}")
+            if fetch_error is not None:
+                raise fetch_error
+            return added
+        except BaseException:
+            await cancel([consumer, fetching, *producers])
+            raise
+
+
+
+def main(config_path: str = 'config.json', urls_path: str = None, rebuild: bool = False, use_async: bool = False):
     """
     Main function of the application.
+    Reads the configuration from config_path once and imports every company in one process.
+    If urls_path is given, the company URLs are read from that file (one per line)
+    instead of the configuration's "company" link.
+    Tracxn responses are served from the on-disk cache where possible; pass rebuild=True to refetch them.
+    Pass use_async=True to pipeline fetching and writing with aiohttp (see sync_companies_async).
     
     This function orchestrates the process of reading the configuration,
-    extracting keys from the Airtable URL, simplifying the company URL,
-    interacting with the Airtable API, and adding data to the Airtable table.
+    extracting keys from the Airtable URL, simplifying the company URLs,
+    fetching the companies from Tracxn in concurrent batched requests, and adding the data
+    to the Airtable table in batches.
     It handles the integration of different functional components and includes
     error handling for various stages of the process.
     
@@ -189,27 +610,48 @@ def main():
         with APIs.
     """
     try:
-        with open('config.json', 'r') as config_file:
-            config = json.load(config_file)
+        if use_async and aiohttp is None:
+            raise ValueError("The pipelined mode requires aiohttp. Please install it with 'pip install aiohttp'.")
+        if rebuild:
+            clear_cache()
+
+        with open(config_path, 'rb') as config_file:
+            config = orjson.loads(config_file.read())
 
         baseKey, tableKey=  extract_keys(config['links']['airtable'])
         if baseKey is None or tableKey is None:
             raise ValueError("Invalid Airtable URL in the configuration.")
 
-        company_url = simplify_url(config['links']['company'])
+        if urls_path:
+            with open(urls_path, 'r') as urls_file:
+                company_urls = [line.strip() for line in urls_file if line.strip()]
+        else:
+            company_urls = config['links']['company']
+            if isinstance(company_urls, str):
+                company_urls = [company_urls]
+        company_urls = list(dict.fromkeys(simplify_url(url) for url in company_urls))
         field_names = config['fields']
 
         airtable_api = getAirtableAPI()
         airtable_table = getAirtableTable(baseKey, tableKey, airtable_api)
         tracxn_token = getTraxcnToken()
 
-        data_to_add = extract_data(request_data(company_url, tracxn_token), field_names)
-        add_data_to_table(data_to_add, airtable_table, field_names)
+        if use_async:
+            asyncio.run(sync_companies_async(company_urls, airtable_table, field_names, tracxn_token, check_for_url=True))
+        else:
+            data_to_add = extract_data(request_data_batch(company_urls, tracxn_token), field_names)
+            add_data_to_table(data_to_add, airtable_table, field_names, check_for_url=True)
 
     except Exception as e:
         logging.error(f"Error in main function: {e}")
         raise
 
 if __name__ == "__main__":
-   main()
+    parser = argparse.ArgumentParser(description="Import company profiles from Tracxn into an Airtable base.")
+    parser.add_argument("--config", default="config.json", help="Path to the configuration file (default: config.json).")
+    parser.add_argument("--urls", help="File with one company URL per line; overrides the configuration's company link.")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Pipeline Tracxn fetches and Airtable writes with aiohttp (must be installed).")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the Tracxn response cache and refetch every company.")
+    args = parser.parse_args()
+    main(config_path=args.config, urls_path=args.urls, rebuild=args.rebuild, use_async=args.use_async)
 